@@ -11,6 +11,9 @@ STATUS_FAILED = "FAILED"
 STATUS_ALMOST_FINISHED = "ALMOST_FINISHED"
 STATUS_FINISHED = "FINISHED"
 
+# ANSI escape sequence to clear the console screen and move the cursor home
+CLEAR_SCREEN_SEQ = "\x1b[2J\x1b[H"
+
 
 # Unreferenced constants:
 QUEUE_SVC_PATH = Path(__file__).resolve().parent
@@ -18,3 +21,7 @@ QUEUE_SVC_PATH = Path(__file__).resolve().parent
 # Referenced constants:
 HEALTH_DIR_PATH = os.path.join(QUEUE_SVC_PATH, "health")
 STATUS_LOGS_FILE = os.path.join(HEALTH_DIR_PATH, "status.log")
+
+# Max parallel requests to the Resource Locker on each beat, for example when looking up
+# the free resources of the queue groups, or when the server does not support changing queues in bulk:
+REQUESTS_MAX_WORKERS = 8
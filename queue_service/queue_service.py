@@ -1,20 +1,55 @@
+import atexit
 import time
 import sys
 import queue_service.constants as const
 import os
 import pprint as pp
 import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
 from service_base.service_base import ServiceBase
 from queue_service import conf, get_time
 from queue_service.rqueue import Rqueue
-from queue_service.utils import queue_has_beat
+from queue_service.utils import queue_has_beat, enable_vt_processing
 from service_base.connection import ResourceLockerConnection
 
 
 rlocker = ResourceLockerConnection()
 
+# The Windows console should understand the ANSI escape sequence that clears the screen on each beat
+if os.name == "nt":
+    enable_vt_processing()
+
 
 class QueueService(ServiceBase):
+    # Configurations do not change while the service is running,
+    # read the ones that are used on each beat only once:
+    _beat_timeout = int(conf["svc"].get("QUEUE_BEAT_TIMEOUT"))
+    _interval = float(conf["svc"].get("INTERVAL"))
+
+    # The service is instantiated again on each beat, so the pool and the in-flight
+    # beat checks are kept on the class to live across the beats.
+    # Beat checks of the queues are executed by this bounded pool of threads:
+    _max_workers = int(conf["svc"].get("MAX_WORKERS"))
+    _pool = ThreadPoolExecutor(
+        max_workers=_max_workers,
+        thread_name_prefix="qbeat",
+    )
+    # Short requests to the Resource Locker that are sent concurrently on each beat
+    # are executed by this pool, so threads are not created again on every beat:
+    _requests_pool = ThreadPoolExecutor(
+        max_workers=const.REQUESTS_MAX_WORKERS,
+        thread_name_prefix="qrequests",
+    )
+    # Beat checks that were submitted to the pool, by the queue ID.
+    # Finished ones are cleared lazily, once per beat:
+    _inflight_beats = {}
+    _beats_lock = threading.Lock()
+    # The status log is written on each beat, keep it open (line buffered)
+    # for the lifetime of the service:
+    _status_log = open(const.STATUS_LOGS_FILE, "a", buffering=1)
+    atexit.register(_status_log.close)
+
     def __init__(self):
         self.initializing_queues = rlocker.get_queues(status=const.STATUS_INITIALIZING)
         # We should fill this right after we checked what queues are not put in status pending
@@ -30,24 +65,34 @@ class QueueService(ServiceBase):
         self.instantiate_pending_queue_objects()
         Rqueue.group_all()
         pp.pprint(Rqueue.grouped_queues)
-        for group in Rqueue.grouped_queues:
-            if group.get("group_type") == "label":
-                resources = rlocker.get_lockable_resources(
-                    free_only=True, label_matches=group.get("group_name")
-                )
-            elif group.get("group_type") == "name":
-                resources = rlocker.get_lockable_resources(
-                    free_only=True, name=group.get("group_name")
-                )
-            else:
-                raise Exception("Group type should be either name or label!")
+        self.clear_finished_beats()
+        # Look up the free resources of all the groups concurrently,
+        # but handle the results by the order of the groups
+        groups_resources = list(
+            self._requests_pool.map(self.get_group_resources, Rqueue.grouped_queues)
+        )
 
+        for group, resources in zip(Rqueue.grouped_queues, groups_resources):
             if resources:
+                # A submitted beat check would wait in the pool without locking its resource,
+                # so the same resource would still look free and be given to another queue.
+                # Promote queues only while there is a free worker to check them right away.
+                if self.is_pool_full():
+                    print("All the workers are busy checking beats, will continue on the next beat \n")
+                    break
+
                 # Prepare by waiting for the next beat by the client
 
-                # Get the info from the waiting queue list of dicts:
+                # Get the info from the waiting queue list of dicts.
+                # A queue should not be checked twice at the same time,
+                # so take the first queue of the group that has no beat check running:
                 group_queues = group.get("queues")
-                next_queue = group_queues.pop(0)
+                next_queue = next(
+                    (q for q in group_queues if not self.is_beat_in_flight(q.id)), None
+                )
+                if next_queue is None:
+                    continue
+                group_queues.remove(next_queue)
                 next_resource = resources.pop(0)
                 # Change to almost finished:
                 prepare_finalize_queue = rlocker.change_queue(
@@ -56,20 +101,68 @@ class QueueService(ServiceBase):
                 )
                 # Prepare the actions before entering to the thread:
                 if prepare_finalize_queue.json().get('status') == const.STATUS_ALMOST_FINISHED:
-                    # The convention for the thread name is Thread-$QID.
-                    # Please do not change unless decided to change naming convention
-                    thread_name = f"Thread-{next_queue.id}"
-                    t = threading.Thread(
-                        name=thread_name,
-                        target=self.queue_beat_check,
-                        args=(next_queue, next_resource)
+                    future = self._pool.submit(
+                        self._wrapped_beat_check, next_queue, next_resource
                     )
-                    t.start()
-                    # More than one thread should not start at the same timestamp
-                    t.join(timeout=0.75)
+                    with self._beats_lock:
+                        self._inflight_beats[next_queue.id] = future
+                    # More than one beat check should not start at the same timestamp
+                    wait([future], timeout=0.75)
 
         return None
 
+    @classmethod
+    def is_beat_in_flight(cls, queue_id):
+        """
+        Check if the queue has a beat check that is still running in the pool
+        :param queue_id:
+        :return bool:
+        """
+        with cls._beats_lock:
+            future = cls._inflight_beats.get(queue_id)
+            return future is not None and not future.done()
+
+    @classmethod
+    def is_pool_full(cls):
+        """
+        Check if all the workers of the pool are busy with beat checks
+        :return bool:
+        """
+        with cls._beats_lock:
+            running_beats = sum(
+                not future.done() for future in cls._inflight_beats.values()
+            )
+        return running_beats >= cls._max_workers
+
+    @classmethod
+    def clear_finished_beats(cls):
+        """
+        Remove the beat checks that are already done from the in-flight beats
+        :return None:
+        """
+        with cls._beats_lock:
+            for queue_id, future in list(cls._inflight_beats.items()):
+                if future.done():
+                    del cls._inflight_beats[queue_id]
+
+    @staticmethod
+    def get_group_resources(group):
+        """
+        Get the free lockable resources that could be locked by the queues of the group
+        :param group: A group of Rqueue.grouped_queues
+        :return: The free lockable resources
+        """
+        if group.get("group_type") == "label":
+            return rlocker.get_lockable_resources(
+                free_only=True, label_matches=group.get("group_name")
+            )
+        elif group.get("group_type") == "name":
+            return rlocker.get_lockable_resources(
+                free_only=True, name=group.get("group_name")
+            )
+        else:
+            raise Exception("Group type should be either name or label!")
+
     def put_queues_on_pending(self):
         """
         This is a method that needs to be started with the startup of the svc.
@@ -78,12 +171,12 @@ class QueueService(ServiceBase):
         This will we a sign that this svc is healthy, and also it is being handled.
         :return: None
         """
-        for queue in self.initializing_queues:
-            queue_id = queue.get("id")
-            queue_response = rlocker.change_queue(queue_id, status="PENDING")
+        queue_ids = [queue.get("id") for queue in self.initializing_queues]
+        changed_queues = self.change_queues_to_pending(queue_ids) if queue_ids else []
+        for queue_id, changed_queue in zip(queue_ids, changed_queues):
             # For each queue, we should verify that the queues changed to being PENDING:
             is_queue_changed = (
-                dict(queue_response.json()).get("status") == const.STATUS_PENDING
+                dict(changed_queue).get("status") == const.STATUS_PENDING
             )
             if not is_queue_changed:
                 print(
@@ -101,12 +194,39 @@ class QueueService(ServiceBase):
                 else f"No queues to Initialize. \n"
             )
             print(
-                f"Total Queues that are {const.STATUS_PENDING}: "
-                f"{len(rlocker.get_queues(status=const.STATUS_PENDING))}"
+                f"Total Queues that were put on {const.STATUS_PENDING}: "
+                f"{len(changed_queues)}"
             )
 
         return None
 
+    @classmethod
+    def change_queues_to_pending(cls, queue_ids):
+        """
+        Put the given queues on PENDING state with a single bulk request.
+        If the server does not support the bulk request, fall back to
+            change each queue on its own, with a bounded amount of parallel requests.
+        Once the server answered that it does not support it,
+            the bulk request is not sent anymore
+        :param queue_ids: List of the queue IDs to change
+        :return list: The queues JSON after the change, in the same order of queue_ids
+        """
+        if rlocker.bulk_update_supported:
+            bulk_response = rlocker.change_queues_bulk(
+                queue_ids, status=const.STATUS_PENDING
+            )
+            if bulk_response.status_code == 200:
+                changed_queues = {
+                    queue.get("id"): queue for queue in bulk_response.json()
+                }
+                return [changed_queues.get(queue_id, {}) for queue_id in queue_ids]
+
+        responses = cls._requests_pool.map(
+            lambda queue_id: rlocker.change_queue(queue_id, status=const.STATUS_PENDING),
+            queue_ids,
+        )
+        return [response.json() for response in responses]
+
     def instantiate_pending_queue_objects(self):
         """
         A method to instantiate objects so it will be easier
@@ -115,9 +235,16 @@ class QueueService(ServiceBase):
             from get_queues()
         :return None:
         """
+        # Queues that are not pending anymore should not be handled
+        Rqueue.delete_all_except({queue.get("id") for queue in self.pending_queues})
         for queue in self.pending_queues:
             # We want to initialize an instance of Rqueue only in case it is not already exists
-            # as Rqueue instance:
+            # as Rqueue instance. Priority and data of a pending queue could change on the server,
+            # so the existing instance is updated from the fresh JSON instead:
+            rqueue = Rqueue.all.get(queue.get("id"))
+            if rqueue is not None:
+                rqueue.update(priority=queue.get("priority"), data=queue.get("data"))
+                continue
             Rqueue(
                 id=queue.get("id"),
                 priority=queue.get("priority"),
@@ -126,20 +253,33 @@ class QueueService(ServiceBase):
 
         return None
 
+    def _wrapped_beat_check(self, next_queue, next_resource):
+        """
+        Run the beat check of the queue inside the pool.
+        Exceptions inside the pool are kept in the future, so print them
+            like an unhandled exception of a thread would be printed
+        :return None:
+        """
+        try:
+            self.queue_beat_check(next_queue, next_resource)
+        except Exception:
+            traceback.print_exc()
+
     def queue_beat_check(self, next_queue, next_resource):
         if queue_has_beat(
                 queue_id=next_queue.id,
-                in_last_x_seconds=conf["svc"].get("QUEUE_BEAT_TIMEOUT"),
+                in_last_x_seconds=self._beat_timeout,
         ):
             attempt_lock = rlocker.lock_resource(
                 next_resource,
                 signoff=next_queue.data.get("signoff"),
                 link=next_queue.data.get("link"),
             )
-            print(attempt_lock.json())
+            attempt_lock_json = attempt_lock.json()
+            print(attempt_lock_json)
 
             # If attempt to lock was successful:
-            if attempt_lock.json().get("is_locked"):
+            if attempt_lock_json.get("is_locked"):
                 rlocker.change_queue(
                     next_queue.id,
                     status=const.STATUS_FINISHED,
@@ -165,9 +305,9 @@ class QueueService(ServiceBase):
         else:
             rlocker.abort_queue(
                 next_queue.id,
-                abort_msg=f"This queue was an orphan queue! \n"
-                f"There was no associated client, because queue was not beating "
-                f' in the last {conf["svc"].get("QUEUE_BEAT_TIMEOUT")} seconds',
+                abort_msg="This queue was an orphan queue! \n"
+                "There was no associated client, because queue was not beating "
+                f" in the last {self._beat_timeout} seconds",
             )
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -179,8 +319,9 @@ class QueueService(ServiceBase):
              - Sleep the program to rest few seconds before next beat
              - Use clean console screen in order to display the most updated
                   status of all queues.
-             - Clear the variables content that are indexed each beat, so that we
-                will not have duplicated data on those variables
+             - Clear the groups that are indexed each beat, so that we
+                will not have duplicated data on those variables.
+                Rqueue.all is kept, it is synced with the pending queues on the next beat
              - Write to status.log current timestamp,
                 this will indicate the last time svc is healthy
 
@@ -192,11 +333,10 @@ class QueueService(ServiceBase):
         :return: None
         """
 
-        time.sleep(conf["svc"].get("INTERVAL"))
-        os.system("cls") if os.name == "nt" else os.system("clear")
-        Rqueue.all.clear()
+        time.sleep(self._interval)
+        sys.stdout.write(const.CLEAR_SCREEN_SEQ)
+        sys.stdout.flush()
         Rqueue.grouped_queues.clear()
-        with open(const.STATUS_LOGS_FILE, "a") as f:
-            # For any new info to write, use comma-separation
-            # Please keep \n as the first log to be written
-            f.write(f"\nTIMESTAMP:{get_time().timestamp()},")
+        # For any new info to write, use comma-separation
+        # Please keep \n as the first log to be written
+        self._status_log.write(f"\nTIMESTAMP:{get_time().timestamp()},")
@@ -10,8 +10,9 @@ from queue_service.utils import (
 
 
 class Rqueue:
-    # This is a list all Rqueue objects that will be instantiated
-    all = []
+    # All the Rqueue objects that were instantiated, by their ID.
+    # Objects are kept across the beats, as long as their queue is still pending
+    all = {}
     # This is the grouped version os the instantiated queues, groups are necessary,
     # to identify what lockable resource needs to be locked once there is a free resource
     grouped_queues = []
@@ -19,11 +20,26 @@ class Rqueue:
     def __init__(self, **kwargs):
         self.id = kwargs.get("id")
         self.priority = kwargs.get("priority")
-        self.data = json_continuously_loader(kwargs.get("data"))
+        # Keep the raw data, so it is parsed again only when it changes on the server
+        self.raw_data = kwargs.get("data")
+        self.data = json_continuously_loader(self.raw_data)
 
         # Keep this line last, we want to store all the instances
-        # after the init actions in a list
-        Rqueue.all.append(self)
+        # after the init actions
+        Rqueue.all[self.id] = self
+
+    def update(self, **kwargs):
+        """
+        Update the instance with the fresh info of its queue,
+            as it is returned from get_queues().
+        The data is parsed again only if it changed
+        :return None:
+        """
+        self.priority = kwargs.get("priority")
+        raw_data = kwargs.get("data")
+        if raw_data != self.raw_data:
+            self.raw_data = raw_data
+            self.data = json_continuously_loader(raw_data)
 
     def __repr__(self):
         """
@@ -69,7 +85,7 @@ class Rqueue:
         :return: List:
         """
         rqueues_list = []
-        for rqueue in Rqueue.all:
+        for rqueue in Rqueue.all.values():
             if rqueue.has_associated_resource:
                 rqueues_list.append(rqueue)
 
@@ -83,7 +99,7 @@ class Rqueue:
         :return: List, sorted by label:
         """
         rqueues_list = []
-        for rqueue in Rqueue.all:
+        for rqueue in Rqueue.all.values():
             if rqueue.has_not_associated_resource:
                 rqueues_list.append(rqueue)
 
@@ -127,6 +143,18 @@ class Rqueue:
                 }
             )
 
+    @staticmethod
+    def delete_all_except(ids):
+        """
+        A Static method to delete the Rqueues that their ID is not in the given IDs,
+            for example the queues that are no longer pending
+        :param ids: IDs of the Rqueues to keep
+        :return None:
+        """
+        for rqueue_id in list(Rqueue.all):
+            if rqueue_id not in ids:
+                del Rqueue.all[rqueue_id]
+
     @staticmethod
     def delete_all():
         """
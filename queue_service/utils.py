@@ -15,6 +15,25 @@ by_data_name_and_priority = lambda q: (q.data.get("name"), q.priority, q.id)
 rlocker = ResourceLockerConnection()
 
 
+def enable_vt_processing():
+    """
+    Enable the virtual terminal processing of the Windows console,
+        so it will understand ANSI escape sequences, like the one that clears the screen.
+    Should be called only on Windows
+    :return None:
+    """
+    import ctypes
+
+    STD_OUTPUT_HANDLE = -11
+    ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.GetStdHandle(STD_OUTPUT_HANDLE)
+    mode = ctypes.c_ulong()
+    if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+        kernel32.SetConsoleMode(handle, mode.value | ENABLE_VIRTUAL_TERMINAL_PROCESSING)
+
+
 def json_continuously_loader(json_string, attempts=10):
     """
     WORKAROUND:
@@ -1,4 +1,12 @@
 import os
+import threading
+import json
+import pprint as pp
+import requests
+import service_base.constants as const
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError
+from urllib3.util.retry import Retry
 from queue_service import conf
 from rlockertools.resourcelocker import ResourceLocker
 
@@ -28,6 +36,16 @@ class ResourceLockerConnection(ResourceLocker, metaclass=Singleton):
     # Resource Locker library will be instantiated against the provided environment variable
     # that will be injected once the container starts.
     # If it is None, it will try to use the one that is provided from the defaultconf.yaml file
+    #
+    # The library sends every request with the module level requests functions,
+    # which opens a new connection each time. The methods that the services use are
+    # overridden here to go through a pooled session, so connections are reused across beats.
+    # The overridden methods are copied from rlockertools==0.4.3 (pinned in requirements.txt),
+    # please compare them with the library when bumping its version.
+    # Each thread gets its own session, so the threads of the service do not
+    # wait on the lock of a single shared connection pool.
+    _tls = threading.local()
+
     def __init__(self):
         super(ResourceLockerConnection, self).__init__(
             instance_url=os.environ.get("RESOURCE_LOCKER_URL")
@@ -35,3 +53,212 @@ class ResourceLockerConnection(ResourceLocker, metaclass=Singleton):
             token=os.environ.get("RESOURCE_LOCKER_TOKEN")
             or conf["svc"].get("RESOURCE_LOCKER_TOKEN"),
         )
+        self.endpoints["rqueues_bulk_update"] = (
+            f"{self.instance_url}/api/rqueues/bulk_update/"
+        )
+        # Turns False once the server answers that it has no bulk endpoint,
+        # so the next beats will not send a request that is known to fail
+        self.bulk_update_supported = True
+
+    @staticmethod
+    def make_session():
+        """
+        Create a requests session with a pooled adapter mounted
+            for both http and https.
+        Sessions are created per thread, so the adapter keeps a single connection
+        :return: requests.Session
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=const.POOL_CONNECTIONS,
+            pool_maxsize=const.POOL_MAXSIZE,
+            max_retries=Retry(
+                total=const.RETRY_TOTAL,
+                backoff_factor=const.RETRY_BACKOFF_FACTOR,
+                status_forcelist=const.RETRY_STATUS_FORCELIST,
+                allowed_methods=const.RETRY_ALLOWED_METHODS,
+                raise_on_status=False,
+            ),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _session(self):
+        """
+        Get the session of the current thread, create it on the first use
+        :return: requests.Session
+        """
+        session = getattr(self._tls, "session", None)
+        if session is None:
+            session = self._tls.session = self.make_session()
+        return session
+
+    def check_connection(self):
+        """
+        Checks Connection to the provided URL after initialization
+
+        :return: None
+        :raises: Connection Error
+        """
+        req = self._session().get(self.instance_url)
+        if req.status_code == 200:
+            print({"CONNECTION": "OK"})
+            return
+        else:
+            # Raise Connection Error if no 200
+            raise ConnectionError
+
+    def abort_queue(self, queue_id, abort_msg=None):
+        """
+        Abort the queue that was created, and expected
+            to have an associated lockable resource
+        :return: req
+        """
+        final_endpoint = self.endpoints["rqueue"] + str(queue_id)
+        req = self._session().get(final_endpoint, headers=self.headers)
+        if req.status_code == 200:
+            data_json = json.dumps(
+                {
+                    "status": "ABORTED",
+                    "description": abort_msg,
+                }
+            )
+
+            req = self._session().put(final_endpoint, headers=self.headers, data=data_json)
+            pp.pprint(req.json())
+            return req
+
+        print(f"Something went wrong aborting the {queue_id} \n")
+        pp.pprint(req.json())
+        return req
+
+    def change_queue(self, queue_id, status, description=None, **datakwargs):
+        """
+        Change the status of the queue.
+        Each k&v pair that is liked to be added to the data section of the queue,
+            will be added via **datakwargs
+        :return: req
+        """
+        final_endpoint = self.endpoints["rqueue"] + str(queue_id)
+        req = self._session().get(final_endpoint, headers=self.headers)
+        if req.status_code == 200:
+            # Check for data dictionary args to override if needed:
+            data_section = json.loads(req.json().get("data"))
+            if datakwargs:
+                for k, v in datakwargs.items():
+                    data_section[k] = v
+
+            print(f"DATA SECTION: {data_section}")
+            to_modify = {"status": status}
+            if description:
+                to_modify["description"] = description
+            to_modify["data"] = data_section
+
+            data_json = json.dumps(to_modify)
+            req = self._session().put(final_endpoint, headers=self.headers, data=data_json)
+            pp.pprint(req.json())
+            return req
+
+        print(f"Something went wrong changing {queue_id} \n")
+        pp.pprint(req.json())
+        return req
+
+    def change_queues_bulk(self, ids, status):
+        """
+        Change the status of multiple queues with a single request.
+        Expected contract of the endpoint:
+            Request body: {"ids": [<queue id>, ...], "status": <status>}
+            Response on 200: a list of the changed queues JSON, each one with its "id",
+                the same as get_queue() returns for a single queue
+        Servers that do not support the bulk endpoint will answer with
+            a non 200 status code, so the caller could fall back to change_queue().
+        On 404/405, bulk_update_supported is set to False to remember it.
+        :param ids: List of queue IDs to change
+        :param status: The status to put the queues on
+        :return: req
+        """
+        data_json = json.dumps({"ids": list(ids), "status": status})
+        req = self._session().post(
+            self.endpoints["rqueues_bulk_update"], headers=self.headers, data=data_json
+        )
+        if req.status_code in (404, 405):
+            self.bulk_update_supported = False
+        return req
+
+    def get_queues(self, status=None):
+        final_endpoint = (
+            self.endpoints["rqueues"] + f"?status={status}"
+            if status
+            else self.endpoints["rqueues"]
+        )
+        req = self._session().get(final_endpoint, headers=self.headers)
+        if req.status_code == 200:
+            # json.loads returns it to a dictionary
+            req_dict = json.loads(req.text.encode("utf8"))
+            return req_dict
+
+    def get_queue(self, queue_id, verify_connection=False):
+        """
+        Return queue JSONIFIED by the given queue_id
+        :param queue_id:
+        :param verify_connection: Check the connection to the server before
+            retrieving the JSON for the specific queue, False by default
+        :return:
+        """
+        if verify_connection:
+            self.check_connection()
+        final_endpoint = self.endpoints["rqueue"] + str(queue_id)
+        req = self._session().get(final_endpoint, headers=self.headers)
+        if req.status_code == 200:
+            return req.json()
+        else:
+            print(
+                f"The request for the queue returned code: {req.status_code} \n"
+                "Response was: \n"
+                f"{req.text}"
+            )
+            return None
+
+    def get_lockable_resources(
+        self, free_only=True, label_matches=None, name=None, signoff=None
+    ):
+        if not signoff:
+            final_endpoint = (
+                self.endpoints["resources"] + f"?free_only={str(free_only).lower()}&"
+            )
+            if label_matches:
+                final_endpoint = f"{final_endpoint}label_matches={label_matches}"
+            if name:
+                final_endpoint = f"{final_endpoint}name={name}"
+        else:
+            final_endpoint = self.endpoints["resources"] + f"?signoff={signoff}"
+
+        req = self._session().get(final_endpoint, headers=self.headers)
+        if req.status_code == 200:
+            # json.loads returns it to a dictionary
+            req_dict = json.loads(req.text.encode("utf8"))
+            return req_dict
+
+        return req
+
+    def lock_resource(self, resource, signoff, link=None):
+        """
+        Method that will lock the requested resource
+        :param resource: Resource to lock
+        :param signoff: A message to write when the requested resource
+            is about to lock
+        :param link:
+        :return: Response after the PUT request
+        """
+        lockable_resource = dict(resource)
+        lockable_resource["is_locked"] = True
+        lockable_resource["signoff"] = signoff
+        if link:
+            lockable_resource["link"] = link
+
+        final_endpoint = self.endpoints["resource"] + lockable_resource["name"]
+        newjson = json.dumps(lockable_resource)
+
+        req = self._session().put(final_endpoint, headers=self.headers, data=newjson)
+        return req
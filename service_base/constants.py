@@ -0,0 +1,15 @@
+# Constants file for the service base package.
+
+# HTTP connection pooling towards the Resource Locker instance, PER THREAD.
+# Each thread has its own session, that talks to a single host with one request at a time:
+POOL_CONNECTIONS = 1
+POOL_MAXSIZE = 1
+
+# Retries for idempotent requests that failed because of the server/gateway.
+# PUT is not retried, a retried lock request could lock the resource twice.
+# Once the retries are exhausted, the last response is returned and not raised,
+# so the callers keep handling the non 200 status codes themselves:
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.2
+RETRY_STATUS_FORCELIST = [502, 503, 504]
+RETRY_ALLOWED_METHODS = ["HEAD", "GET", "OPTIONS"]